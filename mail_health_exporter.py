@@ -9,26 +9,103 @@ for integration with monitoring systems and also via a small minimal status webs
 
 import smtplib
 import imaplib
-import email
 import time
 import logging
+import gzip
 import threading
 import uuid
 import random
 import string
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.utils import formatdate, make_msgid
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 import os
+import select
+import signal
+import sqlite3
+import ssl
 import sys
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional, Union
 
-import requests
 import re
-from bs4 import BeautifulSoup
 
+# Whether the interpreter runs with the GIL. Free-threaded builds (PEP 703)
+# don't guarantee that a plain dict assignment is atomic with respect to
+# concurrent read-modify-write updates, so metric updates fall back to locks there.
+_GIL_ENABLED = getattr(sys, '_is_gil_enabled', lambda: True)()
+
+# Matches the mailServerData object in the status HTML template. The object may
+# contain one level of nested braces (lastUpdated). The pattern is written without
+# nested quantifiers to avoid catastrophic backtracking on large templates.
+_MAIL_SERVER_DATA_RE = re.compile(r'let\s+mailServerData\s*=\s*\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\};')
+
+# Matches the 'Your lovely total: X/10' text on a mail-tester.com result page and
+# captures the integer part of the score. Whitespace, &nbsp; and markup tags are
+# skipped between the parts, as they vanish when the page is rendered as text.
+_MAIL_TESTER_SCORE_RE = re.compile(
+    rb'Your lovely total:(?:\s|&nbsp;|<[^>]*>)*(\d+)(?:\.\d+)?(?:<[^>]*>)*/(?:<[^>]*>)*\d+', re.IGNORECASE)
+
+# How long a scraped mail-tester.com score is reused before the page is fetched again
+_SPAM_SCORE_CACHE_SECONDS = 8 * 60 * 60
+
+# HELP and TYPE declarations of all exported metrics as (name, type, help)
+_METRIC_DECLARATIONS = (
+    ('mail_health_exporter__send_internal_to_external_success_total', 'counter',
+     'Total successful mail sends from internal to external'),
+    ('mail_health_exporter__send_internal_to_external_failures_total', 'counter',
+     'Total failed mail sends from internal to external'),
+    ('mail_health_exporter__receive_internal_to_external_success_total', 'counter',
+     'Total successful mail receipts from internal to external'),
+    ('mail_health_exporter__receive_internal_to_external_failures_total', 'counter',
+     'Total failed mail receipts from internal to external'),
+    ('mail_health_exporter__send_external_to_internal_success_total', 'counter',
+     'Total successful mail sends from external to internal'),
+    ('mail_health_exporter__send_external_to_internal_failures_total', 'counter',
+     'Total failed mail sends from external to internal'),
+    ('mail_health_exporter__receive_external_to_internal_success_total', 'counter',
+     'Total successful mail receipts from external to internal'),
+    ('mail_health_exporter__receive_external_to_internal_failures_total', 'counter',
+     'Total failed mail receipts from external to internal'),
+    ('mail_health_exporter__sending_mails_working', 'gauge',
+     'Status whether the server is able to send mails or not'),
+    ('mail_health_exporter__receiving_mails_working', 'gauge',
+     'Status whether the server is able to receive mails or not'),
+    ('mail_health_exporter__roundtrip_duration_seconds', 'gauge',
+     'Duration (in seconds) of last send-receive check, i.e. of the slower of both concurrently tested mail directions'),
+    ('mail_health_exporter__last_send_receive_check_timestamp', 'gauge',
+     'Timestamp of last send-receive check'),
+    ('mail_health_exporter__spam_score', 'gauge',
+     'Spam score of send mails'),
+    ('mail_health_exporter__last_spam_score_check_timestamp', 'gauge',
+     'Timestamp of last spam-score check'),
+)
+
+# The exposition text never changes except for the metric values, so it is
+# rendered only once into a template with one named placeholder per value.
+_PROMETHEUS_TEMPLATE = '\n'.join(
+    f'# HELP {name} {help_text}\n# TYPE {name} {metric_type}\n{name} {{m[{name}]}}'
+    for name, metric_type, help_text in _METRIC_DECLARATIONS
+)
+
+# Fields of the status page data derived from metrics as
+# metric name -> ((field name, conversion), ...). All of them are gauges,
+# which are only updated via MetricsStore.set_value or MetricsStore.apply.
+# Both refresh the status page data, any other way of updating them would
+# leave the status page stale.
+_STATUS_FIELDS = {
+    'mail_health_exporter__sending_mails_working': (('sendingWorks', bool),),
+    'mail_health_exporter__receiving_mails_working': (('receivingWorks', bool),),
+    'mail_health_exporter__spam_score': (('spamScore', int),),
+    # sending and receiving are checked together, so they share one timestamp
+    'mail_health_exporter__last_send_receive_check_timestamp': (('sendingWorksLastUpdated', float),
+                                                                ('receivingWorksLastUpdated', float)),
+    'mail_health_exporter__last_spam_score_check_timestamp': (('spamScoreLastUpdated', float),),
+}
 
 # ===== METRICS AND PROMETHEUS CLASSES =====
 
@@ -41,8 +118,10 @@ class MetricsStore:
 
     Attributes
     ----------
-    lock : threading.Lock
-        Thread synchronization lock for safe metric updates
+    locks : list of threading.Lock
+        Striped synchronization locks for safe counter increments
+    metric_shard : dict
+        Dictionary mapping each metric name to the index of its lock in `locks`
     metrics : dict
         Dictionary containing all metric names and their current values
     """
@@ -51,7 +130,6 @@ class MetricsStore:
         """
         Initialize the metrics store with default values.
         """
-        self.lock = threading.Lock()
         self.metrics = {
             'mail_health_exporter__send_internal_to_external_success_total': 0,
             'mail_health_exporter__send_internal_to_external_failures_total': 0,
@@ -70,6 +148,26 @@ class MetricsStore:
         }
         self.spam_score_test_url = ""
 
+        # Stripe the locks over the metrics so that unrelated counters
+        # (e.g. sends and receives) never contend for the same lock
+        self.locks = [threading.Lock() for _ in range(16)]
+        self.metric_shard = {name: hash(name) & 15 for name in self.metrics}
+
+        # Prometheus scrapes far more often than the metrics change, so the
+        # rendered output is cached until the next metric update
+        self._cache_lock = threading.Lock()
+        self._cached_output: Optional[bytes] = None
+        self._cached_gzip_output: Optional[bytes] = None
+        self._cache_dirty = True
+
+        # The status page data is kept up to date whenever one of its metrics
+        # is set, so that status page requests just have to copy it
+        self._status_data = {}
+        for metric_name, fields in _STATUS_FIELDS.items():
+            for field_name, convert in fields:
+                self._status_data[field_name] = convert(self.metrics[metric_name])
+        self._status_data['spamScoreTestUrl'] = self.spam_score_test_url
+
     def set_spam_score_test_url(self, url: str) -> None:
         """
         Sets the current value of the spam score test url.
@@ -84,6 +182,7 @@ class MetricsStore:
             URL of the spam-score website
         """
         self.spam_score_test_url = url
+        self._status_data['spamScoreTestUrl'] = url
 
     def increment(self, metric_name: str) -> None:
         """
@@ -94,13 +193,18 @@ class MetricsStore:
         metric_name : str
             Name of the metric to increment
         """
-        with self.lock:
+        with self.locks[self.metric_shard[metric_name]]:
             self.metrics[metric_name] += 1
+        self._cache_dirty = True
 
     def set_value(self, metric_name: str, value: Union[int, float]) -> None:
         """
         Thread-safely set a metric to a specific value.
 
+        With the GIL a single dict assignment (one STORE_SUBSCR bytecode) is
+        atomic, so no lock is required here. Free-threaded interpreters take
+        the metric's lock instead.
+
         Parameters
         ----------
         metric_name : str
@@ -108,140 +212,169 @@ class MetricsStore:
         value : Union[int, float]
             New value to set for the metric
         """
-        with self.lock:
+        if _GIL_ENABLED:
             self.metrics[metric_name] = value
+        else:
+            with self.locks[self.metric_shard.get(metric_name, 0)]:
+                self.metrics[metric_name] = value
+        self._cache_dirty = True
 
-    def get_prometheus_formatted_metrics(self) -> str:
-        """
-        Generate Prometheus-formatted metrics output.
+        for field_name, convert in _STATUS_FIELDS.get(metric_name, ()):
+            self._status_data[field_name] = convert(value)
 
-        Returns
-        -------
-        str
-            Complete Prometheus metrics output with HELP and TYPE declarations
+    def apply(self, values: Optional[dict] = None, increments: tuple = ()) -> None:
         """
-        with self.lock:
-            output = []
-
-            output.append('# HELP mail_health_exporter__send_internal_to_external_success_total Total successful mail sends from internal to external')
-            output.append('# TYPE mail_health_exporter__send_internal_to_external_success_total counter')
-            output.append(f'mail_health_exporter__send_internal_to_external_success_total {self.metrics["mail_health_exporter__send_internal_to_external_success_total"]}')
-
-            output.append('# HELP mail_health_exporter__send_internal_to_external_failures_total Total failed mail sends from internal to external')
-            output.append('# TYPE mail_health_exporter__send_internal_to_external_failures_total counter')
-            output.append(f'mail_health_exporter__send_internal_to_external_failures_total {self.metrics["mail_health_exporter__send_internal_to_external_failures_total"]}')
-
-            output.append('# HELP mail_health_exporter__receive_internal_to_external_success_total Total successful mail receipts from internal to external')
-            output.append('# TYPE mail_health_exporter__receive_internal_to_external_success_total counter')
-            output.append(f'mail_health_exporter__receive_internal_to_external_success_total {self.metrics["mail_health_exporter__receive_internal_to_external_success_total"]}')
-
-            output.append('# HELP mail_health_exporter__receive_internal_to_external_failures_total Total failed mail receipts from internal to external')
-            output.append('# TYPE mail_health_exporter__receive_internal_to_external_failures_total counter')
-            output.append(f'mail_health_exporter__receive_internal_to_external_failures_total {self.metrics["mail_health_exporter__receive_internal_to_external_failures_total"]}')
+        Thread-safely apply several metric updates at once.
 
-            output.append('# HELP mail_health_exporter__send_external_to_internal_success_total Total successful mail sends from external to internal')
-            output.append('# TYPE mail_health_exporter__send_external_to_internal_success_total counter')
-            output.append(f'mail_health_exporter__send_external_to_internal_success_total {self.metrics["mail_health_exporter__send_external_to_internal_success_total"]}')
+        Takes the locks of all affected metrics only once for the whole batch,
+        instead of once per `set_value` or `increment` call.
 
-            output.append('# HELP mail_health_exporter__send_external_to_internal_failures_total Total failed mail sends from external to internal')
-            output.append('# TYPE mail_health_exporter__send_external_to_internal_failures_total counter')
-            output.append(f'mail_health_exporter__send_external_to_internal_failures_total {self.metrics["mail_health_exporter__send_external_to_internal_failures_total"]}')
-
-            output.append('# HELP mail_health_exporter__receive_external_to_internal_success_total Total successful mail receipts from external to internal')
-            output.append('# TYPE mail_health_exporter__receive_external_to_internal_success_total counter')
-            output.append(f'mail_health_exporter__receive_external_to_internal_success_total {self.metrics["mail_health_exporter__receive_external_to_internal_success_total"]}')
-
-            output.append('# HELP mail_health_exporter__receive_external_to_internal_failures_total Total failed mail receipts from external to internal')
-            output.append('# TYPE mail_health_exporter__receive_external_to_internal_failures_total counter')
-            output.append(f'mail_health_exporter__receive_external_to_internal_failures_total {self.metrics["mail_health_exporter__receive_external_to_internal_failures_total"]}')
+        Parameters
+        ----------
+        values : dict, optional
+            Dictionary mapping metric names to the new values to set, by default None
+        increments : tuple, optional
+            Names of the counter metrics to increment by 1, by default ()
+        """
+        values = values or {}
 
-            output.append('# HELP mail_health_exporter__sending_mails_working Status whether the server is able to send mails or not')
-            output.append('# TYPE mail_health_exporter__sending_mails_working gauge')
-            output.append(f'mail_health_exporter__sending_mails_working {self.metrics["mail_health_exporter__sending_mails_working"]}')
+        # acquire the locks in index order, so that concurrent batches can't deadlock
+        shards = sorted({self.metric_shard.get(name, 0) for name in (*values, *increments)})
+        locks = [self.locks[shard] for shard in shards]
+        for lock in locks:
+            lock.acquire()
+        try:
+            self.metrics.update(values)
+            for metric_name in increments:
+                self.metrics[metric_name] += 1
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+        self._cache_dirty = True
+
+        for metric_name, value in values.items():
+            for field_name, convert in _STATUS_FIELDS.get(metric_name, ()):
+                self._status_data[field_name] = convert(value)
+
+    def get_prometheus_formatted_metrics(self, gzip_compressed: bool = False) -> bytes:
+        """
+        Generate UTF-8 encoded Prometheus-formatted metrics output.
 
-            output.append('# HELP mail_health_exporter__receiving_mails_working Status whether the server is able to receive mails or not')
-            output.append('# TYPE mail_health_exporter__receiving_mails_working gauge')
-            output.append(f'mail_health_exporter__receiving_mails_working {self.metrics["mail_health_exporter__receiving_mails_working"]}')
+        The metric values are read from a lock-free snapshot, the static
+        HELP and TYPE declarations come from the precomputed template.
+        The output is only rendered again if a metric changed since the
+        last call, otherwise the cached output is returned. The same holds
+        for the gzip compressed output.
 
-            output.append('# HELP mail_health_exporter__roundtrip_duration_seconds Duration (in seconds) of last full internal->external->internal mail roundtrip')
-            output.append('# TYPE mail_health_exporter__roundtrip_duration_seconds gauge')
-            output.append(f'mail_health_exporter__roundtrip_duration_seconds {self.metrics["mail_health_exporter__roundtrip_duration_seconds"]}')
+        Parameters
+        ----------
+        gzip_compressed : bool, optional
+            Return the output compressed with gzip, by default False
 
-            output.append('# HELP mail_health_exporter__last_send_receive_check_timestamp Timestamp of last send-receive check')
-            output.append('# TYPE mail_health_exporter__last_send_receive_check_timestamp gauge')
-            output.append(f'mail_health_exporter__last_send_receive_check_timestamp {self.metrics["mail_health_exporter__last_send_receive_check_timestamp"]}')
+        Returns
+        -------
+        bytes
+            Complete Prometheus metrics output with HELP and TYPE declarations
+        """
+        with self._cache_lock:
+            if self._cache_dirty:
+                # reset the flag before taking the snapshot, so that an update
+                # racing with the rendering marks the cache as dirty again
+                self._cache_dirty = False
 
-            output.append('# HELP mail_health_exporter__spam_score Spam score of send mails')
-            output.append('# TYPE mail_health_exporter__spam_score gauge')
-            output.append(f'mail_health_exporter__spam_score {self.metrics["mail_health_exporter__spam_score"]}')
+                # dict.copy() is atomic, so the snapshot can be taken without
+                # blocking concurrent metric updates
+                self._cached_output = _PROMETHEUS_TEMPLATE.format(m=self.metrics.copy()).encode('utf-8')
+                self._cached_gzip_output = None
 
-            output.append('# HELP mail_health_exporter__last_spam_score_check_timestamp Timestamp of last spam-score check')
-            output.append('# TYPE mail_health_exporter__last_spam_score_check_timestamp gauge')
-            output.append(f'mail_health_exporter__last_spam_score_check_timestamp {self.metrics["mail_health_exporter__last_spam_score_check_timestamp"]}')
+            if not gzip_compressed:
+                return self._cached_output
 
-            return '\n'.join(output)
+            if self._cached_gzip_output is None:
+                self._cached_gzip_output = gzip.compress(self._cached_output, mtime=0)
+            return self._cached_gzip_output
 
     def get_status_data(self) -> dict:
         """
         Get current metrics data for the status page website.
 
+        The values are already converted when the metrics are set, so this
+        only returns a copy of the precomputed status data.
+
         Returns
         -------
         dict
             Dictionary containing sendingWorks, receivingWorks, and spamScore values
         """
-        with self.lock:
-            return {
-                'sendingWorks': bool(self.metrics['mail_health_exporter__sending_mails_working']),
-                'receivingWorks': bool(self.metrics['mail_health_exporter__receiving_mails_working']),
-                'spamScore': int(self.metrics['mail_health_exporter__spam_score']),
-                'sendingWorksLastUpdated': float(self.metrics['mail_health_exporter__last_send_receive_check_timestamp']),
-                'receivingWorksLastUpdated': float(
-                    self.metrics['mail_health_exporter__last_send_receive_check_timestamp']),
-                'spamScoreLastUpdated': float(
-                    self.metrics['mail_health_exporter__last_spam_score_check_timestamp']),
-                'spamScoreTestUrl': self.spam_score_test_url
-            }
+        return self._status_data.copy()
 
 
-class HTTPHandler(BaseHTTPRequestHandler):
+class MetricsServer(ThreadingHTTPServer):
     """
-    HTTP request handler for Prometheus metrics endpoint and status page website.
+    HTTP server for the Prometheus metrics endpoint and the status page website.
 
-    Handles GET requests to /metrics endpoint and /status endpoint, returns 404 for others.
+    Holds the data shared by all requests, so that the request handlers can
+    access it via their `server` attribute.
 
     Attributes
     ----------
     metrics_store : MetricsStore
         Reference to the metrics storage instance
-    status_html_template : str
-        The HTML content for the status page template
+    status_html_prefix : bytes
+        UTF-8 encoded part of the status page template before the mailServerData object
+    status_html_suffix : bytes
+        UTF-8 encoded part of the status page template after the mailServerData object
+    status_html_has_server_data : bool
+        Whether the template contains a mailServerData object, otherwise the
+        template is served unchanged as `status_html_prefix`
     """
 
-    def __init__(self, request, client_address, server, metrics_store = None, status_html_template: str = "Put your html here"):
+    # Each request is handled in its own daemon thread (inherited from
+    # ThreadingHTTPServer). Allow more pending connections than the default of 5,
+    # so simultaneous scrapes, status page requests and health checks aren't refused.
+    request_queue_size = 64
+
+    def __init__(self, server_address: tuple, metrics_store: MetricsStore,
+                 status_html_prefix: bytes, status_html_suffix: bytes,
+                 status_html_has_server_data: bool = True):
         """
-        Initialize the HTTP request handler.
+        Initialize the HTTP server and bind it to the given address.
 
         Parameters
         ----------
-        request : socket
-            The request socket
-        client_address : tuple
-            Client address information
-            Contains a tuple of the form (host, port) referring to the client’s address.
-        server : HTTPServer
-            The HTTP server instance
-        metrics_store : MetricsStore, optional
-            Reference to metrics storage, by default None
-        status_html_template : str, optional
-            HTML content for status page, by default "Put your html here"
-            This variable describes the template html.
-            Each Get-request will use this template and update it with the
-            current values in the metrics store
+        server_address : tuple
+            Tuple of the form (host, port) the server listens on
+        metrics_store : MetricsStore
+            Reference to metrics storage
+        status_html_prefix : bytes
+            UTF-8 encoded status page template up to the mailServerData object
+        status_html_suffix : bytes
+            UTF-8 encoded status page template after the mailServerData object
+            Each Get-request will put the current values in the metrics store
+            between prefix and suffix of the template html.
+        status_html_has_server_data : bool, optional
+            Whether the template contains a mailServerData object, by default True
         """
         self.metrics_store = metrics_store
-        self.status_html_template = status_html_template
-        super().__init__(request, client_address, server)
+        self.status_html_prefix = status_html_prefix
+        self.status_html_suffix = status_html_suffix
+        self.status_html_has_server_data = status_html_has_server_data
+        super().__init__(server_address, HTTPHandler)
+
+
+class HTTPHandler(BaseHTTPRequestHandler):
+    """
+    HTTP request handler for Prometheus metrics endpoint and status page website.
+
+    Handles GET requests to /metrics endpoint and /status endpoint, returns 404 for others.
+    The metrics store and the status page template are taken from the
+    MetricsServer instance handling the request.
+
+    Attributes
+    ----------
+    server : MetricsServer
+        The HTTP server instance handling the request
+    """
 
     def translate_path(self, path):
         """
@@ -288,24 +421,90 @@ class HTTPHandler(BaseHTTPRequestHandler):
         """
         try:
             if self.path == '/metrics':
-                self.send_response(200)
-                self.send_header('Content-type', 'text/plain; charset=utf-8')
-                self.end_headers()
-                self.wfile.write(self.metrics_store.get_prometheus_formatted_metrics().encode('utf-8'))
+                # Prometheus asks for gzip compressed metrics
+                if self._accepts_gzip():
+                    self._send_complete_response(
+                        200, 'text/plain; charset=utf-8',
+                        self.server.metrics_store.get_prometheus_formatted_metrics(gzip_compressed=True),
+                        extra_headers=(('Content-Encoding', 'gzip'), ('Vary', 'Accept-Encoding')))
+                else:
+                    self._send_complete_response(
+                        200, 'text/plain; charset=utf-8',
+                        self.server.metrics_store.get_prometheus_formatted_metrics(),
+                        extra_headers=(('Vary', 'Accept-Encoding'),))
             elif self.path == '/status':
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html; charset=utf-8')
-                self.end_headers()
-                self.wfile.write(self._get_updated_status_html().encode('utf-8'))
+                self._send_complete_response(200, 'text/html; charset=utf-8', *self._get_updated_status_html())
             else:
-                self.send_response(404)
-                self.end_headers()
+                self._send_complete_response(404, 'text/plain', b'')
         # If the HTTP Server tries to serve a symlink it will raise a permission error
         except PermissionError as e:
-            self.send_response(403)
-            self.send_header("Content-type", "text/plain")
-            self.end_headers()
-            self.wfile.write(str(e).encode())
+            self._send_complete_response(403, 'text/plain', str(e).encode())
+
+    def _accepts_gzip(self) -> bool:
+        """
+        Check whether the client accepts gzip compressed responses.
+
+        Returns
+        -------
+        bool
+            True if the Accept-Encoding header lists gzip without a q-value of 0
+        """
+        for coding in self.headers.get('Accept-Encoding', '').split(','):
+            name, _, parameters = coding.partition(';')
+            if name.strip().lower() == 'gzip':
+                parameters = parameters.replace(' ', '').lower()
+                if not parameters.startswith('q='):
+                    return True
+                try:
+                    return float(parameters[2:]) > 0
+                except ValueError:
+                    return False
+        return False
+
+    def _send_complete_response(self, code: int, content_type: str, *body_parts: bytes,
+                                extra_headers: tuple = ()) -> None:
+        """
+        Send status line, headers and body of a response with a single write.
+
+        `send_response`, `send_header` and `end_headers` write the headers
+        separately from the body, which costs an additional send() syscall.
+        The body may be given in several parts, which are sent with one
+        vectored write (sendmsg) without concatenating them first.
+
+        Parameters
+        ----------
+        code : int
+            HTTP status code of the response
+        content_type : str
+            Value of the Content-type header
+        *body_parts : bytes
+            Parts of the body of the response
+        extra_headers : tuple, optional
+            Additional (name, value) header pairs, by default ()
+        """
+        content_length = sum(len(part) for part in body_parts)
+        self.log_request(code, content_length)
+        header = (f'{self.protocol_version} {code} {self.responses[code][0]}\r\n'
+                  f'Server: {self.version_string()}\r\n'
+                  f'Date: {self.date_time_string()}\r\n'
+                  f'Content-type: {content_type}\r\n'
+                  f'Content-Length: {content_length}\r\n'
+                  + ''.join(f'{name}: {value}\r\n' for name, value in extra_headers) +
+                  f'\r\n')
+        buffers = [header.encode('latin-1'), *body_parts]
+
+        if not hasattr(self.connection, 'sendmsg'):
+            # sendmsg is not available on all platforms (e.g. Windows)
+            self.wfile.write(b''.join(buffers))
+            return
+
+        while buffers:
+            sent = self.connection.sendmsg(buffers)
+            # drop all completely sent buffers and cut off the sent part of the next one
+            while buffers and sent >= len(buffers[0]):
+                sent -= len(buffers.pop(0))
+            if sent:
+                buffers[0] = memoryview(buffers[0])[sent:]
 
     def log_message(self, format: str, *args) -> None:
         """
@@ -321,19 +520,41 @@ class HTTPHandler(BaseHTTPRequestHandler):
         # Suppress default HTTP server logging
         pass
 
-    def _get_updated_status_html(self) -> str:
+    def log_request(self, code: Union[int, str] = '-', size: Union[int, str] = '-') -> None:
+        """
+        Override default request logging to skip building the log message.
+
+        Log messages are suppressed by `log_message` anyway, so there is no
+        need to format the request line and status code for each request.
+
+        Parameters
+        ----------
+        code : Union[int, str], optional
+            HTTP status code of the response (ignored), by default '-'
+        size : Union[int, str], optional
+            Size of the response (ignored), by default '-'
+        """
+        pass
+
+    def _get_updated_status_html(self) -> tuple:
         """
         Update the HTML template with current metrics data.
 
-        Replaces the mailServerData JavaScript object in the HTML template
-        with current values from the metrics store.
+        Creates the mailServerData JavaScript object with current values from
+        the metrics store, which belongs between the pre-split parts of the
+        HTML template. A template without mailServerData object is served
+        unchanged.
 
         Returns
         -------
-        str
-            Updated HTML content with current metrics data
+        tuple of bytes
+            UTF-8 encoded parts of the HTML content with current metrics data,
+            i.e. template prefix, mailServerData object and template suffix
         """
-        status_data = self.metrics_store.get_status_data()
+        if not self.server.status_html_has_server_data:
+            return (self.server.status_html_prefix,)
+
+        status_data = self.server.metrics_store.get_status_data()
 
         # Create the replacement JavaScript object
         replacement_js = f"""let mailServerData = {{
@@ -348,11 +569,152 @@ class HTTPHandler(BaseHTTPRequestHandler):
             }}
 }};"""
 
-        # Use regex to replace the existing mailServerData object
-        pattern = r'let\s+mailServerData\s*=\s*\{(?:[^{}]*(?:\{[^{}]*\})*)*\};'
-        updated_html = re.sub(pattern, replacement_js, self.status_html_template, flags=re.MULTILINE | re.DOTALL)
+        # Only the small JavaScript object has to be encoded per request,
+        # the constant parts of the template are already encoded and aren't copied
+        return self.server.status_html_prefix, replacement_js.encode('utf-8'), self.server.status_html_suffix
+
+# ===== MAIL CONNECTION CLASSES =====
+
+@dataclass(slots=True)
+class MailAccount:
+    """
+    Configuration of a mail account and its SMTP and IMAP servers.
+
+    Attributes
+    ----------
+    address : str
+        Email account address, also used for login
+    password : str
+        Email account password
+    smtp_server : str
+        SMTP server hostname
+    smtp_port : int
+        SMTP server port
+    smtp_use_tls : bool
+        Whether to use TLS for SMTP
+    imap_server : str
+        IMAP server hostname
+    imap_port : int
+        IMAP server port
+    imap_use_tls : bool
+        Whether to use TLS for IMAP
+    """
+    address: str
+    password: str
+    smtp_server: str
+    smtp_port: int
+    smtp_use_tls: bool
+    imap_server: str
+    imap_port: int
+    imap_use_tls: bool
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of persistent SMTP or IMAP connections.
+
+    Keeps one live connection per key (usually (host, port, user)), so that
+    repeated checks don't pay the TLS handshake and LOGIN on every use.
+    Connections that have been idle for a while are checked with a NOOP before
+    they are reused, dead or failing connections are dropped and reopened lazily.
+
+    Attributes
+    ----------
+    max_idle_seconds : float
+        Idle time after which a connection is checked with a NOOP before reuse
+    connections : dict
+        Dictionary mapping each key to a tuple of (connection, last used timestamp)
+    locks : dict
+        Dictionary mapping each key to the lock guarding its connection
+    """
+
+    def __init__(self, is_alive, close, max_idle_seconds: float = 60):
+        """
+        Initialize an empty connection pool.
+
+        Parameters
+        ----------
+        is_alive : callable
+            Function that takes a connection and returns whether it is still usable
+        close : callable
+            Function that takes a connection and closes it
+        max_idle_seconds : float, optional
+            Idle time after which a connection is checked before reuse, by default 60
+        """
+        self._is_alive = is_alive
+        self._close = close
+        self.max_idle_seconds = max_idle_seconds
+        self.connections = {}
+        self.locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _get_lock(self, key: tuple) -> threading.Lock:
+        """
+        Get the lock guarding the connection of the given key.
+
+        Parameters
+        ----------
+        key : tuple
+            Key of the pooled connection
+
+        Returns
+        -------
+        threading.Lock
+            Lock of the pooled connection
+        """
+        with self._locks_lock:
+            return self.locks.setdefault(key, threading.Lock())
+
+    @contextmanager
+    def connection(self, key: tuple, connect):
+        """
+        Borrow the pooled connection of the given key.
+
+        Opens a new connection via `connect` if there is no usable connection
+        in the pool yet. If the block using the connection raises an exception
+        the connection is closed and dropped from the pool.
+
+        Parameters
+        ----------
+        key : tuple
+            Key of the pooled connection
+        connect : callable
+            Function without arguments that opens and logs in a new connection
+
+        Yields
+        ------
+        connection
+            The pooled SMTP or IMAP connection
+        """
+        with self._get_lock(key):
+            connection, last_used = self.connections.pop(key, (None, 0.0))
 
-        return updated_html
+            # check connections which have been idle for a while before reusing them
+            if connection is not None and time.time() - last_used > self.max_idle_seconds:
+                if not self._is_alive(connection):
+                    self._close(connection)
+                    connection = None
+
+            if connection is None:
+                connection = connect()
+
+            try:
+                yield connection
+            except Exception:
+                self._close(connection)
+                raise
+
+            self.connections[key] = (connection, time.time())
+
+    def close_all(self) -> None:
+        """
+        Close all pooled connections.
+        """
+        for key in list(self.connections):
+            with self._get_lock(key):
+                connection, _ = self.connections.pop(key, (None, 0.0))
+                if connection is not None:
+                    self._close(connection)
 
 # ===== MAIN APPLICATION CLASS =====
 
@@ -373,8 +735,16 @@ class MailHealthExporter:
         Application logger
     running : bool
         Service running state flag
+    stop_event : threading.Event
+        Set by stop() to interrupt the waits between checks immediately
     status_html_template : str
         HTML template for the status page
+    status_html_prefix : bytes
+        UTF-8 encoded part of the HTML template before the mailServerData object
+    status_html_suffix : bytes
+        UTF-8 encoded part of the HTML template after the mailServerData object
+    status_html_has_server_data : bool
+        Whether the HTML template contains a mailServerData object
     status_html_file : str
         Path to the status HTML file
     internal_smtp_server : str
@@ -409,6 +779,8 @@ class MailHealthExporter:
         External email account address
     external_email_password : str
         External email account password
+    accounts : dict
+        Dictionary mapping the internal and external email address to its MailAccount
     spam_score_test_email_address : str
         Email address for spam score testing
     spam_score_test_url : str
@@ -421,6 +793,19 @@ class MailHealthExporter:
         Timeout for email operations in seconds
     metrics_port : int
         Port for Prometheus metrics server
+    smtp_pool : ConnectionPool
+        Pool of persistent SMTP connections keyed by (host, port, user)
+    imap_pool : ConnectionPool
+        Pool of persistent IMAP connections keyed by (host, port, user)
+    roundtrip_executor : ThreadPoolExecutor
+        Long-lived worker threads running both directions of the send-receive test
+    spam_score_executor : ThreadPoolExecutor
+        Worker thread retrieving spam scores outside of the main loop
+    state_file : str
+        Path of the SQLite database persisting state across restarts
+    http_session : Optional[requests.Session]
+        HTTP session reusing connections to the spam testing service, created
+        on first use
     """
 
     def __init__(self):
@@ -438,7 +823,11 @@ class MailHealthExporter:
         self.metrics = MetricsStore()
         self.logger = self._setup_logging()
         self.running = False
+        self.stop_event = threading.Event()
         self.status_html_template = ""
+        self.status_html_prefix = b""
+        self.status_html_suffix = b""
+        self.status_html_has_server_data = False
         
         # Status HTML file configuration
         self.status_html_file = os.getenv('STATUS_HTML_FILE', 'status.html')
@@ -465,6 +854,10 @@ class MailHealthExporter:
 
         # Spam score test configuration
         self.last_spam_score_check_timestamp = datetime.now() - timedelta(hours=24)
+        # (url, timestamp) of a restored spam score test whose score was never retrieved
+        self._unretrieved_spam_score_test: Optional[tuple] = None
+        self.state_file = os.getenv('STATE_FILE', 'state.db')
+        self.http_session = None
 
         # Test configuration
         self.check_interval = int(os.getenv('CHECK_INTERVAL_SECONDS', '300'))
@@ -473,6 +866,18 @@ class MailHealthExporter:
         # Prometheus configuration
         self.metrics_port = int(os.getenv('HTTP_PORT', '9091'))
 
+        # Persistent mail connections, reused across checks
+        self.smtp_pool = ConnectionPool(self._is_smtp_connection_alive, self._close_smtp_connection)
+        self.imap_pool = ConnectionPool(self._is_imap_connection_alive, self._close_imap_connection)
+
+        # Worker threads for the two directions of the send-receive test,
+        # reused by every check instead of starting new threads each time
+        self.roundtrip_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='mail-roundtrip')
+
+        # Worker thread waiting for and retrieving the spam score, so that a slow
+        # spam testing service doesn't delay the next send-receive test
+        self.spam_score_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='spam-score')
+
         # Validate required environment variables
         required_vars = [
             'INTERNAL_SMTP_SERVER', 'INTERNAL_IMAP_SERVER',
@@ -491,9 +896,27 @@ class MailHealthExporter:
         if not self.external_email_password:
             raise ValueError("Missing required secret: external_email_password")
 
+        # Mail accounts by address, used to look up the servers and credentials
+        # of sender and recipient of test emails
+        self.accounts = {
+            self.internal_email_address: MailAccount(
+                self.internal_email_address, self.internal_email_password,
+                self.internal_smtp_server, self.internal_smtp_port, self.internal_smtp_use_tls,
+                self.internal_imap_server, self.internal_imap_port, self.internal_imap_use_tls),
+            self.external_email_address: MailAccount(
+                self.external_email_address, self.external_email_password,
+                self.external_smtp_server, self.external_smtp_port, self.external_smtp_use_tls,
+                self.external_imap_server, self.external_imap_port, self.external_imap_use_tls),
+        }
+
         # Load status HTML template
         self._load_status_html_template()
 
+        # Create the tables of the state database and restore the state of the
+        # last spam score test, so that a restart doesn't trigger another one
+        self._setup_state_db()
+        self._load_spam_score_test_state()
+
     # ===== CONFIGURATION AND SETUP METHODS =====
 
     def _set_random_spam_score_variables(self) -> None:
@@ -515,7 +938,10 @@ class MailHealthExporter:
 
         Reads the HTML file specified in STATUS_HTML_FILE environment variable
         (defaults to 'status.html') and stores it as a template for serving
-        at the /status endpoint.
+        at the /status endpoint. The template is split once around its
+        mailServerData object, so that each request only has to insert the
+        current values between the two parts. A template without mailServerData
+        object is served unchanged.
 
         Raises
         ------
@@ -525,6 +951,18 @@ class MailHealthExporter:
         try:
             with open(self.status_html_file, 'r', encoding='utf-8') as f:
                 self.status_html_template = f.read()
+
+            template_parts = _MAIL_SERVER_DATA_RE.split(self.status_html_template, maxsplit=1)
+            if len(template_parts) == 2:
+                self.status_html_prefix = template_parts[0].encode('utf-8')
+                self.status_html_suffix = template_parts[1].encode('utf-8')
+                self.status_html_has_server_data = True
+            else:
+                self.logger.warning(f'No mailServerData object found in {self.status_html_file}, '
+                                    f'the status page is served without current values')
+                self.status_html_prefix = self.status_html_template.encode('utf-8')
+                self.status_html_suffix = b""
+                self.status_html_has_server_data = False
             self.logger.info(f'Successfully loaded status HTML template from {self.status_html_file}')
         except FileNotFoundError:
             self.logger.error(f'Status HTML file not found: {self.status_html_file}')
@@ -533,6 +971,99 @@ class MailHealthExporter:
             self.logger.error(f'Error loading status HTML template: {e}')
             raise
 
+    def _setup_state_db(self) -> None:
+        """
+        Create the tables of the state database if they don't exist yet.
+
+        The database only keeps caches and the rate limit state, so errors are
+        logged and the exporter keeps working without it.
+        """
+        try:
+            with closing(sqlite3.connect(self.state_file)) as db, db:
+                db.execute('CREATE TABLE IF NOT EXISTS spam_score_cache '
+                           '(url TEXT PRIMARY KEY, score INTEGER NOT NULL, ts REAL NOT NULL)')
+                db.execute('CREATE TABLE IF NOT EXISTS spam_score_test '
+                           '(id INTEGER PRIMARY KEY CHECK (id = 1), url TEXT NOT NULL, ts REAL NOT NULL, '
+                           'score INTEGER)')
+                # databases of older versions don't store the score of the test yet
+                columns = [column[1] for column in db.execute('PRAGMA table_info(spam_score_test)')]
+                if 'score' not in columns:
+                    db.execute('ALTER TABLE spam_score_test ADD COLUMN score INTEGER')
+        except sqlite3.Error as e:
+            self.logger.warning(f"Error setting up state database {self.state_file}: {e}")
+
+    def _load_spam_score_test_state(self) -> None:
+        """
+        Restore URL and timestamp of the last spam score test from the state database.
+
+        Also restores the spam score metric, as the next test only runs once
+        the 8-hour rate limit of the restored test expired. If no score was
+        recorded for the test, because the exporter was stopped before it was
+        retrieved, and the rate limit hasn't expired yet, run() retrieves it
+        again. Otherwise the next test records a new score anyway. If there is
+        no stored test, the defaults set in __init__ are kept.
+        """
+        try:
+            with closing(sqlite3.connect(self.state_file)) as db:
+                row = db.execute('SELECT url, ts, score FROM spam_score_test WHERE id = 1').fetchone()
+        except sqlite3.Error as e:
+            self.logger.warning(f"Error reading last spam score test: {e}")
+            return
+
+        if row is None:
+            return
+
+        url, timestamp, score = row
+        self.spam_score_test_url = url
+        self.last_spam_score_check_timestamp = datetime.fromtimestamp(timestamp)
+        self.metrics.set_spam_score_test_url(url)
+        self.metrics.set_value('mail_health_exporter__last_spam_score_check_timestamp', timestamp)
+
+        if score is not None:
+            self.metrics.set_value('mail_health_exporter__spam_score', score)
+        elif time.time() - timestamp < 8 * 60 * 60:
+            self._unretrieved_spam_score_test = (url, timestamp)
+
+        self.logger.info(f"Restored last spam score test from {self.last_spam_score_check_timestamp}: {url}")
+
+    def _save_spam_score_test_state(self, url: str, timestamp: float) -> None:
+        """
+        Store URL and timestamp of the current spam score test in the state database.
+
+        The score of the test is recorded later by _save_spam_score_test_score.
+
+        Parameters
+        ----------
+        url : str
+            The mail-tester.com URL of the spam score test
+        timestamp : float
+            Unix timestamp the spam score test was started at
+        """
+        try:
+            with closing(sqlite3.connect(self.state_file)) as db, db:
+                db.execute('INSERT OR REPLACE INTO spam_score_test (id, url, ts, score) VALUES (1, ?, ?, NULL)',
+                           (url, timestamp))
+        except sqlite3.Error as e:
+            self.logger.warning(f"Error writing last spam score test: {e}")
+
+    def _save_spam_score_test_score(self, url: str, score: int) -> None:
+        """
+        Store the retrieved score of the last spam score test in the state database.
+
+        Parameters
+        ----------
+        url : str
+            The mail-tester.com URL of the spam score test
+        score : int
+            The retrieved spam score
+        """
+        try:
+            with closing(sqlite3.connect(self.state_file)) as db, db:
+                # only update the score if no newer test was started in the meantime
+                db.execute('UPDATE spam_score_test SET score = ? WHERE id = 1 AND url = ?', (score, url))
+        except sqlite3.Error as e:
+            self.logger.warning(f"Error writing score of last spam score test: {e}")
+
     @staticmethod
     def _read_password_from_docker_secret_or_env(secret_name: str) -> Optional[str]:
         """
@@ -611,12 +1142,299 @@ class MailHealthExporter:
 
     # ===== EMAIL SENDING AND RECEIVING METHODS =====
 
+    @staticmethod
+    def _open_smtp_connection(account: MailAccount) -> smtplib.SMTP:
+        """
+        Open a new SMTP connection and log in.
+
+        Uses implicit TLS on port 465 and STARTTLS on other ports if TLS is enabled.
+
+        Parameters
+        ----------
+        account : MailAccount
+            Mail account whose SMTP server and credentials are used
+
+        Returns
+        -------
+        smtplib.SMTP
+            The logged in SMTP connection
+        """
+        # For SSL/TLS servers (usually port 465)
+        if account.smtp_use_tls and account.smtp_port == 465:
+            server = smtplib.SMTP_SSL(account.smtp_server, account.smtp_port)
+        else:
+            # For STARTTLS servers (usually port 587) or plain SMTP (port 25)
+            server = smtplib.SMTP(account.smtp_server, account.smtp_port)
+            if account.smtp_use_tls:
+                server.starttls()
+
+        server.login(account.address, account.password)
+        return server
+
+    @staticmethod
+    def _is_smtp_connection_alive(server: smtplib.SMTP) -> bool:
+        """
+        Check whether an SMTP connection is still usable by sending a NOOP.
+
+        Parameters
+        ----------
+        server : smtplib.SMTP
+            The SMTP connection to check
+
+        Returns
+        -------
+        bool
+            True if the server answered the NOOP, False otherwise
+        """
+        try:
+            return server.noop()[0] == 250
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_smtp_connection(server: smtplib.SMTP) -> None:
+        """
+        Close an SMTP connection, ignoring errors of already dead connections.
+
+        Parameters
+        ----------
+        server : smtplib.SMTP
+            The SMTP connection to close
+        """
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    @staticmethod
+    def _open_imap_connection(account: MailAccount) -> imaplib.IMAP4:
+        """
+        Open a new IMAP connection and log in.
+
+        Parameters
+        ----------
+        account : MailAccount
+            Mail account whose IMAP server and credentials are used
+
+        Returns
+        -------
+        imaplib.IMAP4
+            The logged in IMAP connection
+        """
+        if account.imap_use_tls:
+            mail = imaplib.IMAP4_SSL(account.imap_server, account.imap_port)
+        else:
+            mail = imaplib.IMAP4(account.imap_server, account.imap_port)
+
+        mail.login(account.address, account.password)
+
+        # Servers may announce additional capabilities (e.g. IDLE) only after login
+        result, data = mail.capability()
+        if result == 'OK':
+            mail.capabilities = tuple(data[-1].decode('ascii').upper().split())
+
+        return mail
+
+    @staticmethod
+    def _is_imap_connection_alive(mail: imaplib.IMAP4) -> bool:
+        """
+        Check whether an IMAP connection is still usable by sending a NOOP.
+
+        Parameters
+        ----------
+        mail : imaplib.IMAP4
+            The IMAP connection to check
+
+        Returns
+        -------
+        bool
+            True if the server answered the NOOP, False otherwise
+        """
+        try:
+            return mail.noop()[0] == 'OK'
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quote_imap_string(value: str) -> str:
+        """
+        Quote a string as an argument of an IMAP command.
+
+        imaplib sends command arguments unchanged, so quotes and backslashes in
+        e.g. an email address would otherwise break the command.
+
+        Parameters
+        ----------
+        value : str
+            String to quote
+
+        Returns
+        -------
+        str
+            The string enclosed in double quotes, with quotes and backslashes escaped
+
+        Raises
+        ------
+        ValueError
+            If the string contains line breaks, which can't be quoted
+        """
+        if '\r' in value or '\n' in value:
+            raise ValueError(f'IMAP string must not contain line breaks: {value!r}')
+        return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+    @staticmethod
+    def _delete_test_email(mail: imaplib.IMAP4, from_address: str, unique_id: str,
+                           min_uid: Optional[int] = None) -> bool:
+        """
+        Search the selected mailbox for a test email and delete it.
+
+        All mails matching the search are deleted with a single STORE and
+        EXPUNGE, including duplicates of the same test email.
+
+        Parameters
+        ----------
+        mail : imaplib.IMAP4
+            IMAP connection with a selected mailbox
+        from_address : str
+            Expected sender address of the test email
+        unique_id : str
+            Unique identifier to search for in email subjects
+        min_uid : Optional[int], optional
+            Only search mails with at least this UID, by default None
+
+        Returns
+        -------
+        bool
+            True if the test email was found and deleted, False otherwise
+        """
+        # Search for emails with our unique ID. Only mails since yesterday are
+        # searched (SINCE ignores the time of day and the server's timezone may
+        # differ), and UIDs are used so that concurrent deliveries and expunges
+        # don't change the identifiers of the found mails.
+        since = (datetime.now() - timedelta(days=1)).strftime('%d-%b-%Y')
+        search_criteria = ['SINCE', since,
+                           'FROM', MailHealthExporter._quote_imap_string(from_address),
+                           'SUBJECT', MailHealthExporter._quote_imap_string(f'Mail Health Exporter - {unique_id}')]
+        if min_uid is not None:
+            # lets the server skip all mails which were already there before the test
+            search_criteria[:0] = ['UID', f'{min_uid}:*']
+        result, data = mail.uid('SEARCH', None, *search_criteria)
+
+        if result == 'OK' and data[0]:
+            # The search already matched the unique ID in the subject, so all found
+            # mails are deleted at once. This also cleans up duplicates, e.g. from
+            # retried sends.
+            email_uids = b','.join(data[0].split())
+            mail.uid('STORE', email_uids, '+FLAGS', '(\\Deleted)')
+            if 'UIDPLUS' in mail.capabilities:
+                # only expunge the test emails, not other mails marked as deleted
+                mail.uid('EXPUNGE', email_uids)
+            else:
+                mail.expunge()
+            return True
+
+        return False
+
+    @staticmethod
+    def _wait_for_new_mail(mail: imaplib.IMAP4, max_wait_time: float) -> None:
+        """
+        Wait until new mail arrives in the selected mailbox.
+
+        Uses IMAP IDLE (RFC 2177) if the server supports it, which returns as
+        soon as the server pushes an EXISTS notification or `max_wait_time`
+        expired. Otherwise falls back to polling, sleeps for 10 seconds and sends
+        a NOOP, so that the server reports mails which arrived in the meantime.
+
+        Parameters
+        ----------
+        mail : imaplib.IMAP4
+            IMAP connection with a selected mailbox
+        max_wait_time : float
+            Maximum time to wait for new mail in seconds
+
+        Raises
+        ------
+        imaplib.IMAP4.error
+            If the server rejected the IDLE command
+        imaplib.IMAP4.abort
+            If the server closed the connection while idling
+        """
+        if 'IDLE' not in mail.capabilities:
+            time.sleep(min(10, max_wait_time))
+            mail.noop()
+            return
+
+        connection_closed = False
+
+        def read_line() -> bytes:
+            nonlocal connection_closed
+            line = mail.readline()
+            if not line:
+                connection_closed = True
+                raise mail.abort('socket error: EOF during IDLE')
+            return line
+
+        def has_buffered_response() -> bool:
+            # Responses which were already read into imaplib's buffer (or the SSL
+            # layer) together with earlier lines are invisible to select(), so
+            # peek into the buffer without blocking first
+            sock_timeout = mail.sock.gettimeout()
+            mail.sock.setblocking(False)
+            try:
+                return bool(mail.file.peek(1))
+            except (BlockingIOError, ssl.SSLWantReadError):
+                return False
+            finally:
+                mail.sock.settimeout(sock_timeout)
+
+        tag = mail._new_tag()
+        mail.send(tag + b' IDLE\r\n')
+
+        # The server may report mails which arrived since the last command with
+        # untagged responses before it accepts the IDLE command
+        new_mail = False
+        response = read_line()
+        while response.startswith(b'*'):
+            new_mail = new_mail or b'EXISTS' in response
+            response = read_line()
+        if not response.startswith(b'+'):
+            raise mail.error(f'IDLE command failed: {response!r}')
+
+        deadline = time.monotonic() + max_wait_time
+        try:
+            while (not new_mail) and (remaining := deadline - time.monotonic()) > 0:
+                if has_buffered_response() or select.select([mail.socket()], [], [], remaining)[0]:
+                    new_mail = b'EXISTS' in read_line()
+        finally:
+            # leave IDLE state and consume everything up to the tagged completion,
+            # unless the server already closed the connection
+            if not connection_closed:
+                mail.send(b'DONE\r\n')
+                while not read_line().startswith(tag):
+                    pass
+
+    @staticmethod
+    def _close_imap_connection(mail: imaplib.IMAP4) -> None:
+        """
+        Close an IMAP connection, ignoring errors of already dead connections.
+
+        Parameters
+        ----------
+        mail : imaplib.IMAP4
+            The IMAP connection to close
+        """
+        try:
+            mail.logout()
+        except Exception:
+            mail.shutdown()
+
     def send_test_email(self, from_address: str, to_address: str, unique_id: str) -> bool:
         """
         Send a test email with unique identifier.
 
         Sends a test email using the appropriate SMTP server based on the sender
-        address. Updates metrics based on success/failure.
+        address. The SMTP connection is kept open in the connection pool and
+        reused by the next test email. Updates metrics based on success/failure.
 
         Parameters
         ----------
@@ -636,20 +1454,9 @@ class MailHealthExporter:
 
         try:
             # check if from_address is either internal or external email address
-            # and set configuration variables accordingly
-            if from_address == self.internal_email_address:
-                email_address = self.internal_email_address
-                email_password = self.internal_email_password
-                smtp_server = self.internal_smtp_server
-                smtp_port = self.internal_smtp_port
-                use_tls = self.internal_smtp_use_tls
-            elif from_address == self.external_email_address:
-                email_address = self.external_email_address
-                email_password = self.external_email_password
-                smtp_server = self.external_smtp_server
-                smtp_port = self.external_smtp_port
-                use_tls = self.external_smtp_use_tls
-            else:
+            # and get its account configuration accordingly
+            account = self.accounts.get(from_address)
+            if account is None:
                 self.logger.error("Function send_test_email failed: from_address '{}' was neither internal address "
                                   "'{}' nor external address '{}'".format(from_address, self.internal_email_address,
                                                                           self.external_email_address))
@@ -676,18 +1483,19 @@ class MailHealthExporter:
 
                 email_message.attach(MIMEText(email_body, 'plain'))
 
-                # For SSL/TLS servers (usually port 465)
-                if use_tls and smtp_port == 465:
-                    server = smtplib.SMTP_SSL(smtp_server, smtp_port)
-                else:
-                    # For STARTTLS servers (usually port 587) or plain SMTP (port 25)
-                    server = smtplib.SMTP(smtp_server, smtp_port)
-                    if use_tls:
-                        server.starttls()
+                def connect() -> smtplib.SMTP:
+                    return self._open_smtp_connection(account)
 
-                server.login(email_address, email_password)
-                server.send_message(email_message)
-                server.quit()
+                # A pooled connection may have been closed by the server in the
+                # meantime, in this case reconnect once and retry
+                smtp_pool_key = (account.smtp_server, account.smtp_port, account.address)
+                try:
+                    with self.smtp_pool.connection(smtp_pool_key, connect) as server:
+                        server.send_message(email_message)
+                except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                    self.logger.info(f'SMTP connection to {account.smtp_server} was lost, reconnecting: {e}')
+                    with self.smtp_pool.connection(smtp_pool_key, connect) as server:
+                        server.send_message(email_message)
 
                 self.logger.info(f'Successfully sent test email with ID: {unique_id}')
                 success = True
@@ -697,29 +1505,73 @@ class MailHealthExporter:
             success = False
 
         if success:
-            self.metrics.set_value('mail_health_exporter__sending_mails_working', 1)
-
             if from_address == self.internal_email_address:
-                self.metrics.increment('mail_health_exporter__send_internal_to_external_success_total')
+                counter = 'mail_health_exporter__send_internal_to_external_success_total'
             else:
-                self.metrics.increment('mail_health_exporter__send_external_to_internal_success_total')
-        else:
-            self.metrics.set_value('mail_health_exporter__sending_mails_working', 0)
+                counter = 'mail_health_exporter__send_external_to_internal_success_total'
 
+            self.metrics.apply({'mail_health_exporter__sending_mails_working': 1}, (counter,))
+        else:
             if from_address == self.internal_email_address:
-                self.metrics.increment('mail_health_exporter__send_internal_to_external_failures_total')
+                counter = 'mail_health_exporter__send_internal_to_external_failures_total'
             else:
-                self.metrics.increment('mail_health_exporter__send_external_to_internal_failures_total')
+                counter = 'mail_health_exporter__send_external_to_internal_failures_total'
+
+            self.metrics.apply({'mail_health_exporter__sending_mails_working': 0}, (counter,))
 
         return success
 
+    def get_inbox_uid_baseline(self, address: str) -> Optional[tuple]:
+        """
+        Get the UID the next mail delivered to an inbox will get.
+
+        Called before sending a test email, so that the inbox check only has to
+        search the mails that arrived afterwards. The values are taken from the
+        response to selecting the inbox, as the pooled connection usually still
+        has it selected and STATUS shouldn't be used on the selected mailbox
+        (RFC 3501, section 6.3.10).
+
+        Parameters
+        ----------
+        address : str
+            Address of the inbox (must be internal or external email address)
+
+        Returns
+        -------
+        Optional[tuple]
+            (UIDVALIDITY, UIDNEXT) of the inbox, or None if it couldn't be determined
+        """
+        account = self.accounts.get(address)
+        if account is None:
+            return None
+
+        def connect() -> imaplib.IMAP4:
+            return self._open_imap_connection(account)
+
+        try:
+            with self.imap_pool.connection((account.imap_server, account.imap_port, account.address), connect) as mail:
+                result, _ = mail.select('inbox')
+                uid_validity = mail.response('UIDVALIDITY')[1][0]
+                uid_next = mail.response('UIDNEXT')[1][0]
+        except Exception as e:
+            self.logger.warning(f'Error getting UIDNEXT of inbox {address}: {e}')
+            return None
+
+        if result != 'OK' or uid_validity is None or uid_next is None:
+            return None
+        return int(uid_validity), int(uid_next)
+
     def check_inbox_for_test_email(self, from_address: str, to_address: str, unique_id: str,
-                                   max_wait_time: int = 300) -> bool:
+                                   max_wait_time: int = 300, uid_baseline: Optional[tuple] = None) -> bool:
         """
         Check for and delete a test email from an inbox.
 
         Polls the specified inbox for a test email with the given unique ID,
-        deletes it when found, and updates metrics accordingly.
+        deletes it when found, and updates metrics accordingly. The IMAP
+        connection is kept open in the connection pool and the inbox is
+        selected only once, so that the polls just have to search again.
+        Between two polls the server is asked to notify about new mails via
+        IMAP IDLE if supported, otherwise the inbox is checked every 10 seconds.
 
         Parameters
         ----------
@@ -732,6 +1584,10 @@ class MailHealthExporter:
             Unique identifier to search for in email subjects
         max_wait_time : int, optional
             Maximum time to wait for email in seconds, by default 300
+        uid_baseline : Optional[tuple], optional
+            (UIDVALIDITY, UIDNEXT) of the inbox from before the test email was
+            sent, see get_inbox_uid_baseline. If given, only mails with a higher
+            UID are searched. By default None
 
         Returns
         -------
@@ -740,19 +1596,8 @@ class MailHealthExporter:
         """
         success = True
 
-        if to_address == self.internal_email_address:
-            email_address = self.internal_email_address
-            email_password = self.internal_email_password
-            imap_server = self.internal_imap_server
-            imap_port = self.internal_imap_port
-            imap_use_tls = self.internal_imap_use_tls
-        elif to_address == self.external_email_address:
-            email_address = self.external_email_address
-            email_password = self.external_email_password
-            imap_server = self.external_imap_server
-            imap_port = self.external_imap_port
-            imap_use_tls = self.external_imap_use_tls
-        else:
+        account = self.accounts.get(to_address)
+        if account is None:
             self.logger.error(
                 "Function check_inbox_for_test_email failed: to_address '{}' was neither from internal server "
                 "'{}' nor external server '{}'".format(to_address, self.internal_email_address,
@@ -763,114 +1608,183 @@ class MailHealthExporter:
             """Check for the test email in the inbox"""
             start_time = time.time()
 
+            def connect() -> imaplib.IMAP4:
+                return self._open_imap_connection(account)
+
+            imap_pool_key = (account.imap_server, account.imap_port, account.address)
+
             success = False
             while (not success) and (time.time() - start_time < max_wait_time):
                 try:
-                    if imap_use_tls:
-                        mail = imaplib.IMAP4_SSL(imap_server, imap_port)
-                    else:
-                        mail = imaplib.IMAP4(imap_server, imap_port)
-
-                    mail.login(email_address, email_password)
-                    mail.select('inbox')
-
-                    # Search for emails from the last hour with our unique ID
-                    search_criteria = f'(FROM "{from_address}" SUBJECT "Mail Health Exporter - {unique_id}")'
-                    result, data = mail.search(None, search_criteria)
-
-                    if result == 'OK' and data[0]:
-                        email_ids = data[0].split()
-
-                        # loop over all found mails that matched the search-criteria
-                        # - fetch the email and load it into variable
-                        # - check if id is part of the emails subject
-                        # - delete mail from mailbox
-                        for email_id in email_ids:
-                            result, email_data = mail.fetch(email_id, '(RFC822)')
-                            if result == 'OK':
-                                email_message = email.message_from_bytes(email_data[0][1])
-                                subject = email_message['Subject']
-
-                                # delete mail
-                                if unique_id in subject:
-                                    # Delete the test email
-                                    mail.store(email_id, '+FLAGS', '\\Deleted')
-                                    mail.expunge()
-
-                                    success = True
-                                    break  # leave for-loop
-
-                    mail.close()
-                    mail.logout()
-
+                    with self.imap_pool.connection(imap_pool_key, connect) as mail:
+                        # Select the inbox only once, afterwards the server reports
+                        # new mails on the open connection
+                        mail.select('inbox')
+
+                        # UIDs are only comparable as long as UIDVALIDITY didn't change
+                        min_uid = None
+                        if uid_baseline is not None:
+                            uid_validity = mail.response('UIDVALIDITY')[1][0]
+                            if uid_validity is not None and int(uid_validity) == uid_baseline[0]:
+                                min_uid = uid_baseline[1]
+
+                        success = self._delete_test_email(mail, from_address, unique_id, min_uid)
+
+                        while (not success) and (remaining_time := max_wait_time - (time.time() - start_time)) > 0:
+                            # Wait until new mails arrived before searching again
+                            self._wait_for_new_mail(mail, remaining_time)
+                            success = self._delete_test_email(mail, from_address, unique_id, min_uid)
+
+                # The failed connection was dropped from the pool, so the next
+                # iteration reconnects
                 except Exception as e:
                     self.logger.error(f'Error checking for test email: {e}')
                     time.sleep(10)  # Wait before retrying
-                    continue
-
-                time.sleep(10)  # Check every 10 seconds
 
             if success:
                 self.logger.info(f'Successfully received and deleted test email: {unique_id}')
-                self.metrics.set_value('mail_health_exporter__receiving_mails_working', 1)
 
                 if from_address == self.internal_email_address:
-                    self.metrics.increment('mail_health_exporter__receive_internal_to_external_success_total')
+                    counter = 'mail_health_exporter__receive_internal_to_external_success_total'
                 else:
-                    self.metrics.increment('mail_health_exporter__receive_external_to_internal_success_total')
+                    counter = 'mail_health_exporter__receive_external_to_internal_success_total'
+
+                self.metrics.apply({'mail_health_exporter__receiving_mails_working': 1}, (counter,))
             else:
                 self.logger.error(f'Test email not found within {max_wait_time} seconds: {unique_id}')
-                self.metrics.set_value('mail_health_exporter__receiving_mails_working', 0)
 
                 if from_address == self.internal_email_address:
-                    self.metrics.increment('mail_health_exporter__receive_internal_to_external_failures_total')
+                    counter = 'mail_health_exporter__receive_internal_to_external_failures_total'
                 else:
-                    self.metrics.increment('mail_health_exporter__receive_external_to_internal_failures_total')
+                    counter = 'mail_health_exporter__receive_external_to_internal_failures_total'
+
+                self.metrics.apply({'mail_health_exporter__receiving_mails_working': 0}, (counter,))
 
             return success
 
     # ===== SPAM SCORE MONITORING METHODS =====
 
-    def extract_mail_tester_score(self, url: str) -> int:
+    def _get_cached_spam_score(self, url: str) -> Optional[int]:
+        """
+        Look up a recently scraped spam score in the state database.
+
+        Parameters
+        ----------
+        url : str
+            The mail-tester.com URL the score was scraped from
+
+        Returns
+        -------
+        Optional[int]
+            The cached spam score, or None if there is no score younger than
+            `_SPAM_SCORE_CACHE_SECONDS` or the database can't be read
+        """
+        try:
+            with closing(sqlite3.connect(self.state_file)) as db:
+                row = db.execute('SELECT score FROM spam_score_cache WHERE url = ? AND ts > ?',
+                                 (url, time.time() - _SPAM_SCORE_CACHE_SECONDS)).fetchone()
+        except sqlite3.Error as e:
+            self.logger.warning(f"Error reading spam score cache: {e}")
+            return None
+
+        return row[0] if row else None
+
+    def _cache_spam_score(self, url: str, score: int) -> None:
+        """
+        Store a scraped spam score in the state database.
+
+        Expired entries are removed at the same time, so the cache doesn't grow
+        with the random URL of every test.
+
+        Parameters
+        ----------
+        url : str
+            The mail-tester.com URL the score was scraped from
+        score : int
+            The scraped spam score
+        """
+        now = time.time()
+        try:
+            with closing(sqlite3.connect(self.state_file)) as db, db:
+                db.execute('DELETE FROM spam_score_cache WHERE ts <= ?', (now - _SPAM_SCORE_CACHE_SECONDS,))
+                db.execute('INSERT OR REPLACE INTO spam_score_cache (url, score, ts) VALUES (?, ?, ?)',
+                           (url, score, now))
+        except sqlite3.Error as e:
+            self.logger.warning(f"Error writing spam score cache: {e}")
+
+    def _get_http_session(self):
+        """
+        Get the HTTP session for the spam testing service, creating it on first use.
+
+        The session keeps connections alive between requests and asks for
+        compressed responses. `requests` is only imported here, as it is a large
+        package that is needed for nothing but the spam score test.
+
+        Returns
+        -------
+        requests.Session
+            The shared HTTP session
+        """
+        if self.http_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            http_session = requests.Session()
+            http_adapter = HTTPAdapter(pool_connections=2, pool_maxsize=2)
+            http_session.mount('https://', http_adapter)
+            http_session.mount('http://', http_adapter)
+            http_session.headers.update({
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+                'Accept-Encoding': 'gzip, deflate',
+            })
+            self.http_session = http_session
+
+        return self.http_session
+
+    def extract_mail_tester_score(self, url: str, force_rescrape: bool = False) -> int:
         """
         Extract spam score from a mail-tester.com URL.
 
         Fetches the webpage and parses the spam score from the 'Your lovely total: X/10'
-        text pattern.
+        text pattern. Successfully parsed scores are cached in the state database,
+        so the same URL is only fetched again after `_SPAM_SCORE_CACHE_SECONDS`.
 
         Parameters
         ----------
         url : str
             The mail-tester.com URL to scrape for spam score
+        force_rescrape : bool, optional
+            Fetch the webpage even if a cached score exists, by default False
 
         Returns
         -------
         int
             The extracted spam score (0-10), or 0 if extraction failed
         """
+        if not force_rescrape:
+            cached_score = self._get_cached_spam_score(url)
+            if cached_score is not None:
+                self.logger.info(f"Using cached score: {cached_score}")
+                return cached_score
+
+        import requests
+
         score = 0
         try:
-            # Send GET request to the URL
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(url, headers=headers)
+            # Send GET request to the URL, with connect and read timeouts so that
+            # a hanging server can't block the spam score test forever
+            response = self._get_http_session().get(url, timeout=(5, 20))
             response.raise_for_status()
 
-            # Parse the HTML content
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Look for the exact text pattern directly in the raw HTML
+            match_score = _MAIL_TESTER_SCORE_RE.search(response.content)
 
-            # Look for the exact text pattern using regex
-            text_content = soup.get_text()
-            pattern_full_score_text = r'Your lovely total:\s*(\d+(?:\.\d+)?/\d+)'
-            match_full_score_text = re.search(pattern_full_score_text, text_content, re.IGNORECASE)
-
-            if match_full_score_text:
-                match_score_value = re.search(r'\d+', match_full_score_text.group(1))
-                score = int(match_score_value.group())
+            if match_score:
+                score = int(match_score.group(1))
                 self.logger.info(f"Successfully parsed score: {score}")
+                self._cache_spam_score(url, score)
             else:
-                self.logger.info(f"Failed to parse score from html: {text_content}")
+                self.logger.info(f"Failed to parse score from html: {response.text}")
 
         except requests.RequestException as e:
             self.logger.error(f"Error fetching URL: {e}")
@@ -881,6 +1795,33 @@ class MailHealthExporter:
 
     # ===== MAIL HEALTH CHECK MAIN METHODS =====
 
+    def run_mail_roundtrip(self, from_address: str, to_address: str, unique_id: str) -> None:
+        """
+        Run a mail test in one direction.
+
+        Sends a test email from `from_address` to `to_address`, waits until it
+        was received in the mailbox of `to_address` and deletes it from there.
+
+        Parameters
+        ----------
+        from_address : str
+            Sender email address (must be internal or external email address)
+        to_address : str
+            Recipient email address (must be internal or external email address)
+        unique_id : str
+            Unique identifier for tracking the test email
+
+        Returns
+        -------
+        None
+        """
+        # Remember where new mails start in the recipient's mailbox
+        uid_baseline = self.get_inbox_uid_baseline(to_address)
+        # Send test email
+        self.send_test_email(from_address, to_address, unique_id)
+        # Wait and check for if mail was received in the recipient's mailbox
+        self.check_inbox_for_test_email(from_address, to_address, unique_id, self.timeout_seconds, uid_baseline)
+
     def run_mail_send_receive_test(self):
         """
         Run a complete mail roundtrip test between internal and external servers.
@@ -892,36 +1833,43 @@ class MailHealthExporter:
         4. Sending a test email from external to internal server
         5. Checking if the email was received in the internal mailbox
         6. Deleting the received email from the internal mailbox
-        7. Recording the total roundtrip duration as a metric
+        7. Recording the duration of the whole test as a metric
 
-        The test uses a unique identifier to track individual test messages
-        and measures the complete roundtrip time for monitoring purposes.
+        Both directions (steps 1-3 and steps 4-6) are independent of each other
+        and run concurrently, each on its own SMTP and IMAP connection.
+
+        Each direction uses its own unique identifier to track its test message,
+        so that a search in one direction never matches the mail of the other.
+        As both directions run concurrently, the measured duration is the one of
+        the slower direction (including reading the UID baseline of its inbox),
+        not the sum of both.
 
         Returns
         -------
         None
         """
-        unique_id = str(uuid.uuid4())[:8]
+        internal_to_external_id = str(uuid.uuid4())[:8]
+        external_to_internal_id = str(uuid.uuid4())[:8]
         start_time = time.time()
 
-        self.logger.info(f'Starting mail test (Internal -> External) with ID: {unique_id}')
-        # Send test email from internal to external
-        self.send_test_email(self.internal_email_address, self.external_email_address, unique_id)
-        # Wait and check for if mail was received in external mailbox
-        self.check_inbox_for_test_email(self.internal_email_address, self.external_email_address, unique_id,
-                                        self.timeout_seconds)
-
-        self.logger.info(f'Starting mail test (External -> Internal) with ID: {unique_id}')
-        # Send test email from internal to external
-        self.send_test_email(self.external_email_address, self.internal_email_address, unique_id)
-        # Wait and check for if mail was received in external mailbox
-        self.check_inbox_for_test_email(self.external_email_address, self.internal_email_address, unique_id,
-                                        self.timeout_seconds)
+        self.logger.info(f'Starting mail test (Internal -> External) with ID: {internal_to_external_id}')
+        self.logger.info(f'Starting mail test (External -> Internal) with ID: {external_to_internal_id}')
+        roundtrips = [
+            self.roundtrip_executor.submit(self.run_mail_roundtrip, self.internal_email_address,
+                                           self.external_email_address, internal_to_external_id),
+            self.roundtrip_executor.submit(self.run_mail_roundtrip, self.external_email_address,
+                                           self.internal_email_address, external_to_internal_id),
+        ]
+        # re-raise unexpected errors of both directions in the main loop
+        for roundtrip in roundtrips:
+            roundtrip.result()
 
         # calculate total roundtrip time
         duration = time.time() - start_time
-        self.metrics.set_value('mail_health_exporter__roundtrip_duration_seconds', duration)
-        self.metrics.set_value('mail_health_exporter__last_send_receive_check_timestamp', start_time)
+        self.metrics.apply({
+            'mail_health_exporter__roundtrip_duration_seconds': duration,
+            'mail_health_exporter__last_send_receive_check_timestamp': start_time,
+        })
         self.logger.info(f'Mail test completed in {duration:.2f} seconds')
 
     def run_mail_spam_score_test(self):
@@ -932,6 +1880,7 @@ class MailHealthExporter:
         1. Checks if at least 8 hours have passed since the last spam test
         2. If enough time has passed, sends a test email to spam testing service
         3. Retrieves and records the spam score from the testing service
+           in the background, see retrieve_spam_score
         4. Updates the last check timestamp
 
         The 8-hour rate limit prevents excessive API calls to the spam testing
@@ -950,9 +1899,10 @@ class MailHealthExporter:
             self._set_random_spam_score_variables()
             self.metrics.set_spam_score_test_url(self.spam_score_test_url)
 
-            # set timestamp
-            self.metrics.set_value('mail_health_exporter__last_spam_score_check_timestamp', time.time())
+            # set timestamp, persisted so that the rate limit survives restarts
+            self.metrics.set_value('mail_health_exporter__last_spam_score_check_timestamp', current_time.timestamp())
             self.last_spam_score_check_timestamp = current_time
+            self._save_spam_score_test_state(self.spam_score_test_url, current_time.timestamp())
 
             # send test mail
             unique_id = str(uuid.uuid4())[:8]
@@ -961,17 +1911,48 @@ class MailHealthExporter:
                              f'{self.spam_score_test_email_address}')
             self.send_test_email(self.internal_email_address, self.spam_score_test_email_address, unique_id)
 
-            # wait until message is processed by mail tester website
-            time.sleep(60)
-
-            # retrieve spam score from website
-            self.logger.info(f'Retrieving spam score from url {self.spam_score_test_url}')
-            spam_score = self.extract_mail_tester_score(self.spam_score_test_url)
-            self.metrics.set_value('mail_health_exporter__spam_score', spam_score)
+            # retrieve spam score without blocking the main loop
+            self.spam_score_executor.submit(self.retrieve_spam_score, self.spam_score_test_url)
 
         else:
             self.logger.info("Spam score test doesn't need to run yet.")
 
+    def retrieve_spam_score(self, url: str, wait_seconds: float = 60) -> None:
+        """
+        Wait for the spam testing service and record the spam score.
+
+        Runs on the spam score worker thread. Waits until the test email was
+        processed by the mail tester website, then retrieves the spam score
+        from `url` and records it as a metric. Returns early without
+        retrieving the score if the exporter is stopped in the meantime.
+
+        Parameters
+        ----------
+        url : str
+            The mail-tester.com URL of the spam score test
+        wait_seconds : float, optional
+            Time the mail tester website needs to process the test email,
+            by default 60
+
+        Returns
+        -------
+        None
+        """
+        # wait until message is processed by mail tester website
+        if self.stop_event.wait(wait_seconds):
+            return
+
+        # The future of this worker is never awaited, so errors have to be
+        # logged here instead of in the main loop
+        try:
+            # retrieve spam score from website
+            self.logger.info(f'Retrieving spam score from url {url}')
+            spam_score = self.extract_mail_tester_score(url)
+            self.metrics.set_value('mail_health_exporter__spam_score', spam_score)
+            self._save_spam_score_test_score(url, spam_score)
+        except Exception as e:
+            self.logger.error(f'Unexpected error retrieving spam score: {e}')
+
     # ===== MISC METHODS =====
 
     def start_prometheus_server(self):
@@ -981,13 +1962,15 @@ class MailHealthExporter:
         This method initializes and starts an HTTP server that serves Prometheus
         metrics on the configured port. The server runs in a daemon thread to
         allow the main application to continue running while metrics are served.
+        Each request is handled in its own thread, so a slow client can't block
+        other scrapes or the status page.
 
-        The server uses a custom handler factory that provides access to the
-        metrics store for serving current metric values to Prometheus scrapers.
+        The server holds the metrics store and the status page template, so that
+        its request handlers can serve current metric values to Prometheus scrapers.
 
         Returns
         -------
-        server : HTTPServer
+        server : MetricsServer
             The started HTTP server instance for serving Prometheus metrics
 
         Notes
@@ -995,32 +1978,9 @@ class MailHealthExporter:
         The server is bound to '0.0.0.0' to accept connections from any interface.
         The daemon thread ensures the server shuts down when the main process exits.
         """
-
-        def handler_factory(request, client_address, server):
-            """
-            Factory function to create an HTTPHandler instance with custom parameters.
-
-            "Factory" in the sense of Factory Design Pattern - which is the way how HTTPServer is designed
-            This function is used by the HTTPServer to generate handler instances for
-            each request, with access to the metrics store and status HTML template.
-
-            Parameters
-            ----------
-            request : request
-                The HTTP request object.
-            client_address : tuple
-                The client's address (IP, port).
-            server : HTTPServer
-                The HTTP server instance.
-
-            Returns
-            -------
-            HTTPHandler
-                An instance of the HTTPHandler that processes the request.
-            """
-            return HTTPHandler(request, client_address, server, self.metrics, self.status_html_template)
-
-        server = HTTPServer(('0.0.0.0', self.metrics_port), handler_factory)
+        server = MetricsServer(('0.0.0.0', self.metrics_port), self.metrics,
+                               self.status_html_prefix, self.status_html_suffix,
+                               self.status_html_has_server_data)
 
         def serve_forever():
             """
@@ -1051,8 +2011,8 @@ class MailHealthExporter:
         4. Provides error recovery for unexpected exceptions
 
         The loop runs until the service is stopped via interrupt signal or
-        by setting the running flag to False. Each iteration performs both
-        send/receive tests and spam score tests.
+        by calling stop(), which also interrupts the wait between two checks.
+        Each iteration performs both send/receive tests and spam score tests.
 
         Returns
         -------
@@ -1066,11 +2026,20 @@ class MailHealthExporter:
             Caught and logged, service continues with 30-second delay
         """
         self.running = True
+        self.stop_event.clear()
         self.logger.info('Mail Health Exporter service starting...')
 
         # Start Prometheus metrics server
         prometheus_server = self.start_prometheus_server()
 
+        # Retrieve the score of a restored spam score test within its rate limit,
+        # if the exporter was stopped before it was retrieved. Otherwise it would
+        # only be updated with the next test once the rate limit expired.
+        if self._unretrieved_spam_score_test is not None:
+            url, timestamp = self._unretrieved_spam_score_test
+            self._unretrieved_spam_score_test = None
+            self.spam_score_executor.submit(self.retrieve_spam_score, url, max(0.0, 60 - (time.time() - timestamp)))
+
         while self.running:
             try:
                 # Run send, receive test
@@ -1082,28 +2051,37 @@ class MailHealthExporter:
                 self.metrics.set_value('last_check_timestamp', time.time())
 
                 self.logger.info(f'Waiting {self.check_interval} seconds until next check...')
-                time.sleep(self.check_interval)
+                self.stop_event.wait(self.check_interval)
 
             except KeyboardInterrupt:
                 self.logger.info('Received interrupt signal, shutting down...')
-                self.running = False
+                self.stop()
             except Exception as e:
                 self.logger.error(f'Unexpected error in main loop: {e}')
-                time.sleep(30)  # Wait before retrying
+                self.stop_event.wait(30)  # Wait before retrying
+
+        # Stop worker threads and close persistent connections
+        self.roundtrip_executor.shutdown()
+        self.spam_score_executor.shutdown()
+        self.smtp_pool.close_all()
+        self.imap_pool.close_all()
+        if self.http_session is not None:
+            self.http_session.close()
 
     def stop(self):
         """
         Stop the Mail Health Exporter service gracefully.
 
         This method provides a clean way to stop the service by setting
-        the running flag to False, which will cause the main service loop
-        to exit on its next iteration.
+        the running flag to False and waking up the main service loop, which
+        will cause it to exit right after the currently running check.
 
         Returns
         -------
         None
         """
         self.running = False
+        self.stop_event.set()
 
 def main():
     """
@@ -1125,6 +2103,9 @@ def main():
     """
     mail_health_exporter = MailHealthExporter()
 
+    # Shut down cleanly when the container is stopped
+    signal.signal(signal.SIGTERM, lambda signum, frame: mail_health_exporter.stop())
+
     try:
         mail_health_exporter.run()
     except Exception as e: